@@ -4,20 +4,58 @@ Autor: Kaique Vieira Miranda
 
 O cliente conecta-se ao servidor, lê mensagens digitadas pelo usuário no
 terminal e envia ao servidor. As respostas recebidas são exibidas no console.
-`select` é utilizado para multiplexar o socket do servidor e a entrada padrão
-do usuário sem bloquear a interface interativa.
+`select.epoll` (ou `selectors`, fora do Linux) é utilizado para multiplexar o
+socket do servidor e a entrada padrão do usuário sem bloquear a interface interativa.
 """
 
 from __future__ import annotations
 
+import os
 import select
+import selectors
 import socket
 import sys
-from typing import Optional
+from typing import Final, Optional
+
+# ``select.epoll`` só existe no Linux; nos demais sistemas o mesmo laço roda
+# sobre ``selectors``, que reporta apenas prontidão para leitura.
+_EPOLLIN: Final[int] = getattr(select, "EPOLLIN", 0x001)
+_EPOLLERR: Final[int] = getattr(select, "EPOLLERR", 0x008)
+_EPOLLHUP: Final[int] = getattr(select, "EPOLLHUP", 0x010)
+
+
+class _SelectorPoller:
+    """Subconjunto da interface de ``select.epoll`` implementado com ``selectors``."""
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+
+    def register(self, fd: int, eventmask: int = _EPOLLIN) -> None:
+        self._selector.register(fd, selectors.EVENT_READ)
+
+    def unregister(self, fd: int) -> None:
+        self._selector.unregister(fd)
+
+    def poll(self, timeout: Optional[float] = None) -> list[tuple[int, int]]:
+        return [(key.fd, _EPOLLIN) for key, _ in self._selector.select(timeout)]
+
+    def close(self) -> None:
+        self._selector.close()
+
+    def __enter__(self) -> "_SelectorPoller":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def _new_poller() -> "select.epoll | _SelectorPoller":
+    """Cria um epoll quando disponível ou o equivalente baseado em ``selectors``."""
+    return select.epoll() if hasattr(select, "epoll") else _SelectorPoller()
 
 
 class TCPClient:
-    """Cliente TCP interativo utilizando select para multiplexação."""
+    """Cliente TCP interativo utilizando epoll para multiplexação."""
 
     def __init__(self, host: str = "127.0.0.1", port: int = 5000, buffer_size: int = 1024) -> None:
         """Inicializa os parâmetros básicos do cliente.
@@ -32,11 +70,19 @@ class TCPClient:
         self.buffer_size = buffer_size
 
         self._socket: Optional[socket.socket] = None
+        self._wake_reader: Optional[socket.socket] = None
+        self._wake_writer: Optional[socket.socket] = None
         self._running: bool = False
+        self._rx_buf = bytearray(buffer_size)
+        self._rx_view = memoryview(self._rx_buf)
+        # Bytes lidos da entrada padrão que ainda não formam uma linha completa.
+        self._stdin_buf = bytearray()
 
     def start(self) -> None:
         """Inicia o cliente e aguarda interação do usuário."""
         self._socket = self._connect()
+        # Permite que stop() acorde o epoll, que espera sem timeout.
+        self._wake_reader, self._wake_writer = socket.socketpair()
         self._running = True
         print(f"[CLIENT] Conectado em {self.host}:{self.port}. Digite mensagens ou 'exit' para sair.")
 
@@ -45,7 +91,7 @@ class TCPClient:
         except KeyboardInterrupt:
             print("\n[CLIENT] Interrompido pelo usuário.")
         finally:
-            self.stop()
+            self._close()
 
     def _connect(self) -> socket.socket:
         """Cria o socket e realiza a conexão síncrona ao servidor."""
@@ -60,42 +106,83 @@ class TCPClient:
     def _event_loop(self) -> None:
         """Multiplexa a leitura do socket e da entrada padrão."""
         assert self._socket is not None
-        inputs = [self._socket, sys.stdin]
-
-        while self._running:
-            readable, _, exceptional = select.select(inputs, [], inputs, 0.5)
-
-            for stream in exceptional:
-                if stream is self._socket:
-                    raise ConnectionError("[CLIENT] Erro no socket do servidor.")
-
-            for stream in readable:
-                if stream is self._socket:
-                    self._receive_message()
-                else:
+        assert self._wake_reader is not None
+        socket_fd = self._socket.fileno()
+        stdin_fd = sys.stdin.fileno()
+        wake_fd = self._wake_reader.fileno()
+
+        with _new_poller() as poller:
+            poller.register(socket_fd, _EPOLLIN)
+            poller.register(wake_fd, _EPOLLIN)
+
+            # No Windows o select só aceita sockets; lá a entrada padrão é lida
+            # a cada volta do laço, assim como quando ela é um arquivo regular.
+            stdin_always_ready = sys.platform == "win32"
+            if not stdin_always_ready:
+                try:
+                    poller.register(stdin_fd, _EPOLLIN)
+                except PermissionError:
+                    # O epoll recusa arquivos regulares (EPERM), cuja leitura
+                    # nunca bloqueia.
+                    stdin_always_ready = True
+
+            while self._running:
+                for fd, mask in poller.poll(0 if stdin_always_ready else None):
+                    if fd == wake_fd:
+                        break
+
+                    if fd == socket_fd:
+                        if mask & _EPOLLIN:
+                            self._receive_message()
+                        elif mask & (_EPOLLERR | _EPOLLHUP):
+                            raise ConnectionError("[CLIENT] Erro no socket do servidor.")
+                    else:
+                        # EPOLLHUP na entrada padrão sinaliza EOF, tratado pela leitura.
+                        self._handle_user_input()
+
+                    if not self._running:
+                        break
+
+                if stdin_always_ready and self._running:
                     self._handle_user_input()
 
     def _handle_user_input(self) -> None:
-        """Lê uma linha do usuário e envia ao servidor."""
-        assert self._socket is not None
-        line = sys.stdin.readline()
+        """Lê a entrada padrão e envia ao servidor cada linha completa.
+
+        A leitura vai direto ao descritor com ``os.read``: o buffer interno de
+        ``sys.stdin`` poderia reter linhas já lidas sem que o epoll voltasse a
+        sinalizar o descritor.
+        """
+        chunk = os.read(sys.stdin.fileno(), 4096)
 
-        if line == "":
-            # EOF (Ctrl+D). Encerra a aplicação.
+        if not chunk:
+            # EOF (Ctrl+D). Envia a última linha sem quebra, se houver, e encerra.
+            if self._stdin_buf:
+                self._process_line(bytes(self._stdin_buf))
+                self._stdin_buf.clear()
             self._running = False
             return
 
+        self._stdin_buf += chunk
+        while self._running and b"\n" in self._stdin_buf:
+            line, _, rest = self._stdin_buf.partition(b"\n")
+            self._stdin_buf = rest
+            self._process_line(bytes(line))
+
+    def _process_line(self, line: bytes) -> None:
+        """Valida uma linha digitada e a envia ao servidor."""
+        assert self._socket is not None
         message = line.strip()
         if not message:
             print("[CLIENT] Mensagem vazia não enviada.")
             return
 
-        if message.lower() in {"exit", "quit"}:
+        if message.decode("utf-8", errors="replace").lower() in {"exit", "quit"}:
             self._running = False
             return
 
         try:
-            self._socket.sendall(message.encode("utf-8"))
+            self._socket.sendall(message)
         except (BlockingIOError, InterruptedError):
             print("[CLIENT] Socket temporariamente indisponível; tente novamente.")
         except OSError as exc:
@@ -105,19 +192,29 @@ class TCPClient:
         """Recebe e exibe a resposta do servidor."""
         assert self._socket is not None
         try:
-            data = self._socket.recv(self.buffer_size)
+            size = self._socket.recv_into(self._rx_view)
         except (BlockingIOError, InterruptedError):
             return
 
-        if not data:
+        if not size:
             print("[CLIENT] Conexão encerrada pelo servidor.")
             self._running = False
             return
 
-        print(f"[CLIENT] Resposta: {data.decode('utf-8').strip()}")
+        print(f"[CLIENT] Resposta: {str(self._rx_view[:size], 'utf-8').strip()}")
 
     def stop(self) -> None:
-        """Encerra a aplicação e fecha o socket."""
+        """Solicita o encerramento do loop de eventos, mesmo a partir de outra thread."""
+        self._running = False
+
+        if self._wake_writer is not None:
+            try:
+                self._wake_writer.send(b"\0")
+            except OSError:
+                pass
+
+    def _close(self) -> None:
+        """Fecha o socket do servidor e os sockets de despertar."""
         self._running = False
 
         if self._socket is not None:
@@ -128,6 +225,11 @@ class TCPClient:
             self._socket.close()
             self._socket = None
 
+        for wake_socket in (self._wake_reader, self._wake_writer):
+            if wake_socket is not None:
+                wake_socket.close()
+        self._wake_reader = self._wake_writer = None
+
         print("[CLIENT] Cliente encerrado.")
 
 
@@ -2,17 +2,212 @@
 
 Autor: Kaique Vieira Miranda
 
-O servidor aceita múltiplos clientes simultaneamente utilizando o módulo
-``select`` para multiplexação de I/O. O cliente e o servidor utilizam
-sockets configurados em modo não bloqueante, com validação de mensagens
-vazias e encerramento seguro da conexão.
+O servidor aceita múltiplos clientes simultaneamente utilizando
+``select.epoll`` para multiplexação de I/O (``selectors`` fora do Linux). O
+cliente e o servidor utilizam sockets configurados em modo não bloqueante,
+com validação de mensagens vazias e encerramento seguro da conexão.
+
+Para aproveitar múltiplos núcleos, o servidor pode iniciar vários processos
+que escutam na mesma porta com ``SO_REUSEPORT``; o kernel distribui as novas
+conexões entre as filas de ``accept`` de cada processo.
 """
 
 from __future__ import annotations
 
+import ctypes
+import ctypes.util
+import errno
+import multiprocessing
+import os
 import select
+import selectors
+import signal
 import socket
-from typing import Optional
+import struct
+import sys
+from typing import Final, Optional
+
+# Constantes do Linux (>= 4.14) ainda não expostas pelo módulo ``socket``.
+_SO_ZEROCOPY: Final[int] = getattr(socket, "SO_ZEROCOPY", 60)
+_MSG_ZEROCOPY: Final[int] = getattr(socket, "MSG_ZEROCOPY", 0x4000000)
+_SO_EE_ORIGIN_ZEROCOPY: Final[int] = 5
+_SOCK_EXTENDED_ERR: Final[struct.Struct] = struct.Struct("=IBBBBII")
+
+# Abaixo deste tamanho o custo fixo do zero-copy supera a cópia para o kernel.
+ZEROCOPY_THRESHOLD: Final[int] = 16384
+
+# ``select.epoll`` só existe no Linux; nos demais sistemas o mesmo laço roda
+# sobre ``selectors``, que reporta apenas prontidão para leitura.
+_EPOLLIN: Final[int] = getattr(select, "EPOLLIN", 0x001)
+_EPOLLERR: Final[int] = getattr(select, "EPOLLERR", 0x008)
+_EPOLLHUP: Final[int] = getattr(select, "EPOLLHUP", 0x010)
+_EPOLLRDHUP: Final[int] = getattr(select, "EPOLLRDHUP", 0x2000)
+
+
+class _SelectorPoller:
+    """Subconjunto da interface de ``select.epoll`` implementado com ``selectors``."""
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+
+    def register(self, fd: int, eventmask: int = _EPOLLIN) -> None:
+        self._selector.register(fd, selectors.EVENT_READ)
+
+    def unregister(self, fd: int) -> None:
+        self._selector.unregister(fd)
+
+    def poll(self, timeout: Optional[float] = None) -> list[tuple[int, int]]:
+        return [(key.fd, _EPOLLIN) for key, _ in self._selector.select(timeout)]
+
+    def close(self) -> None:
+        self._selector.close()
+
+    def __enter__(self) -> "_SelectorPoller":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def _new_poller() -> "select.epoll | _SelectorPoller":
+    """Cria um epoll quando disponível ou o equivalente baseado em ``selectors``."""
+    return select.epoll() if hasattr(select, "epoll") else _SelectorPoller()
+
+
+# Partes fixas das respostas, codificadas uma única vez.
+_OK_PREFIX: Final[bytes] = b"Mensagem recebida: "
+_NL: Final[bytes] = b"\n"
+_EMPTY_MSG: Final[bytes] = "Mensagem inválida: mensagem vazia.\n".encode("utf-8")
+
+
+class _ZeroCopySender:
+    """Envia buffers com ``MSG_ZEROCOPY`` mantendo-os vivos até a conclusão.
+
+    O kernel lê os bytes diretamente da memória do processo depois que
+    ``sendmsg`` retorna, então cada trecho enviado fica guardado até chegar a
+    notificação correspondente na fila de erros do socket.
+    """
+
+    def __init__(self) -> None:
+        self._next_id = 0
+        self._inflight: dict[int, memoryview] = {}
+
+    @staticmethod
+    def enable(sock: socket.socket) -> Optional[_ZeroCopySender]:
+        """Ativa ``SO_ZEROCOPY`` no socket, retornando ``None`` se não houver suporte."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, _SO_ZEROCOPY, 1)
+        except OSError:
+            return None
+        return _ZeroCopySender()
+
+    def send(self, sock: socket.socket, payload: bytes) -> None:
+        """Envia todo o ``payload`` sem copiá-lo para o kernel."""
+        self.reap(sock)
+        view = memoryview(payload)
+        while view:
+            try:
+                sent = sock.sendmsg([view], [], _MSG_ZEROCOPY)
+            except OSError as exc:
+                if exc.errno != errno.ENOBUFS:
+                    raise
+                # Limite de páginas fixadas atingido: envia o restante copiando.
+                sock.sendall(view)
+                return
+            self._inflight[self._next_id] = view[:sent]
+            self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+            view = view[sent:]
+
+    def reap(self, sock: socket.socket) -> None:
+        """Libera os buffers cujas notificações de conclusão já chegaram."""
+        while self._inflight:
+            try:
+                _, ancdata, _, _ = sock.recvmsg(0, socket.CMSG_SPACE(64), socket.MSG_ERRQUEUE)
+            except (BlockingIOError, InterruptedError):
+                return
+            for _, _, data in ancdata:
+                _, origin, _, _, _, first, last = _SOCK_EXTENDED_ERR.unpack_from(data)
+                if origin != _SO_EE_ORIGIN_ZEROCOPY:
+                    continue
+                for offset in range(((last - first) & 0xFFFFFFFF) + 1):
+                    self._inflight.pop((first + offset) & 0xFFFFFFFF, None)
+
+
+class _SockaddrIn(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_uint16),
+        ("sin_addr", ctypes.c_ubyte * 4),
+        ("sin_zero", ctypes.c_ubyte * 8),
+    ]
+
+
+class _Accept4:
+    """Chama ``accept4`` da libc via ``ctypes``.
+
+    O socket aceito já nasce não bloqueante e com ``FD_CLOEXEC``, dispensando
+    a syscall extra de ``setblocking(False)`` após o ``accept``.
+    """
+
+    def __init__(self, libc: ctypes.CDLL) -> None:
+        self._accept4 = libc.accept4
+        self._accept4.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint32), ctypes.c_int]
+        self._accept4.restype = ctypes.c_int
+        self._name = _SockaddrIn()
+        self._namelen = ctypes.c_uint32()
+
+    def accept(self, server_socket: socket.socket) -> tuple[socket.socket, tuple[str, int]]:
+        """Aceita uma conexão, como ``socket.accept``, já em modo não bloqueante."""
+        self._namelen.value = ctypes.sizeof(_SockaddrIn)
+        flags = socket.SOCK_NONBLOCK | socket.SOCK_CLOEXEC
+        fd = self._accept4(server_socket.fileno(), ctypes.addressof(self._name), ctypes.byref(self._namelen), flags)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        # Com SOCK_NONBLOCK no tipo, o objeto assume timeout zero sem novas syscalls.
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM | socket.SOCK_NONBLOCK, 0, fileno=fd)
+        addr = (socket.inet_ntoa(bytes(self._name.sin_addr)), socket.ntohs(self._name.sin_port))
+        return client_socket, addr
+
+
+def _load_accept4() -> Optional[_Accept4]:
+    """Carrega ``accept4`` quando a plataforma oferece suporte (Linux)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        return _Accept4(libc)
+    except (OSError, AttributeError):
+        return None
+
+
+# Valor de PR_SET_PDEATHSIG em <linux/prctl.h>.
+_PR_SET_PDEATHSIG: Final[int] = 1
+
+
+def _exit_with_parent(parent_pid: int) -> bool:
+    """Pede ao kernel um SIGTERM para este processo quando o pai terminar.
+
+    Assim nenhum worker continua escutando na porta se o processo pai for
+    morto sem chance de encerrá-los. Retorna ``False`` se o pai já terminou
+    antes do pedido, caso em que o sinal nunca chegaria.
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.prctl(_PR_SET_PDEATHSIG, signal.SIGTERM, 0, 0, 0)
+    except (OSError, AttributeError):
+        pass
+    return os.getppid() == parent_pid
+
+
+def _available_cpus() -> list[int]:
+    """Retorna os identificadores das CPUs disponíveis para o processo."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
 
 
 class TCPServer:
@@ -23,69 +218,180 @@ class TCPServer:
     seu conteúdo no console e responde com uma confirmação.
     """
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 5000, buffer_size: int = 1024) -> None:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 5000,
+        buffer_size: int = 1024,
+        workers: Optional[int] = None,
+    ) -> None:
         """Inicializa o servidor TCP.
 
         Args:
             host: Endereço IP no qual o servidor irá escutar.
             port: Porta TCP na qual o servidor irá escutar.
             buffer_size: Tamanho do buffer de leitura em bytes.
+            workers: Quantidade de processos atendendo a porta. Por padrão,
+                um por CPU disponível.
         """
         self.host: str = host
         self.port: int = port
         self.buffer_size: int = buffer_size
+        self.workers: int = workers if workers is not None else len(_available_cpus())
 
         self._server_socket: Optional[socket.socket] = None
-        self._client_sockets: set[socket.socket] = set()
+        self._epoll: Optional["select.epoll | _SelectorPoller"] = None
+        self._wake_reader: Optional[socket.socket] = None
+        self._wake_writer: Optional[socket.socket] = None
+        self._client_sockets: dict[int, socket.socket] = {}
+        # Preenchido no primeiro envio grande; None marca sockets sem suporte.
+        self._zerocopy: dict[int, Optional[_ZeroCopySender]] = {}
+        self._accept4: Optional[_Accept4] = None
         self._running: bool = False
+        self._processes: list[multiprocessing.Process] = []
+        self._parent_pid = os.getpid()
+        # Buffer de leitura reaproveitado por todas as conexões do worker.
+        self._rx_buf = bytearray(buffer_size)
+        self._rx_view = memoryview(self._rx_buf)
 
     def start(self) -> None:
-        """Inicia o servidor e entra no loop principal de atendimento.
+        """Inicia o servidor e aguarda o encerramento dos processos de atendimento.
 
-        O método configura o socket do servidor em modo não bloqueante
-        e passa a aceitar e tratar múltiplas conexões de clientes.
+        Com mais de um worker, cada processo abre o próprio socket de escuta
+        com ``SO_REUSEPORT`` e executa um loop de eventos independente.
+        Fora do Linux, o servidor roda em um único processo.
         """
+        if self.workers > 1 and not sys.platform.startswith("linux"):
+            # Só o Linux balanceia as conexões entre sockets com SO_REUSEPORT;
+            # nos BSDs e no macOS um único socket receberia todas elas.
+            self.workers = 1
+        if self.workers <= 1:
+            self._run_worker(0)
+            return
+
+        # Um SIGTERM no pai vira KeyboardInterrupt para que stop() encerre os
+        # workers; sem isso eles continuariam escutando na porta como órfãos.
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        self._parent_pid = os.getpid()
+
+        processes = [
+            multiprocessing.Process(target=self._run_worker, args=(worker_id,), name=f"tcp-worker-{worker_id}")
+            for worker_id in range(self.workers)
+        ]
+        try:
+            for process in processes:
+                process.start()
+                # Registrado já aqui para que stop() alcance os workers iniciados
+                # mesmo se o próximo start() for interrompido.
+                self._processes.append(process)
+
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # O Ctrl+C também chega aos workers, que encerram seus próprios sockets.
+            pass
+        finally:
+            self.stop()
+
+    def _run_worker(self, worker_id: int) -> None:
+        """Configura o socket de escuta do worker e entra no loop de atendimento.
+
+        Args:
+            worker_id: Índice do worker, usado para fixá-lo em uma CPU.
+        """
+        if self.workers > 1:
+            # O terminate() do processo pai chega como SIGTERM; tratá-lo como
+            # Ctrl+C reaproveita o encerramento ordenado do worker.
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+            # A lista herdada do pai pertence a ele; o worker não a encerra.
+            self._processes = []
+            if not _exit_with_parent(self._parent_pid):
+                return
+            if hasattr(os, "sched_setaffinity"):
+                cpus = _available_cpus()
+                os.sched_setaffinity(0, {cpus[worker_id % len(cpus)]})
+
         self._server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.workers > 1:
+            self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self._server_socket.setblocking(False)
 
         self._server_socket.bind((self.host, self.port))
         self._server_socket.listen()
+        # Carregado no worker: objetos da libc não atravessam o fork/spawn.
+        self._accept4 = _load_accept4()
+
+        self._epoll = _new_poller()
+        self._epoll.register(self._server_socket.fileno(), _EPOLLIN)
+
+        # O par de sockets permite que stop() acorde o epoll, que espera sem timeout.
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._epoll.register(self._wake_reader.fileno(), _EPOLLIN)
 
         self._running = True
-        print(f"[SERVER] Servidor escutando em {self.host}:{self.port}")
+        print(f"[SERVER] Worker {worker_id} escutando em {self.host}:{self.port}")
 
         try:
             self._serve_forever()
         except KeyboardInterrupt:
             print("\n[SERVER] Interrompido pelo usuário.")
         finally:
-            self.stop()
+            self._close()
 
     def _serve_forever(self) -> None:
         """Loop principal do servidor para aceitar e tratar clientes."""
         assert self._server_socket is not None
+        assert self._epoll is not None
+        assert self._wake_reader is not None
+        server_fd = self._server_socket.fileno()
+        wake_fd = self._wake_reader.fileno()
 
         while self._running:
-            read_list = [self._server_socket, *self._client_sockets]
+            events = self._epoll.poll()
 
-            readable, _, exceptional = select.select(read_list, [], read_list, 0.5)
+            for fd, mask in events:
+                if fd == wake_fd:
+                    # Aviso de stop(): consome o byte e volta a checar _running.
+                    self._wake_reader.recv(1)
+                    break
 
-            for sock in readable:
-                if sock is self._server_socket:
+                if fd == server_fd:
                     self._accept_new_client()
-                else:
-                    self._handle_client_message(sock)
+                    continue
+
+                client_socket = self._client_sockets.get(fd)
+                if client_socket is None:
+                    continue
+
+                zerocopy = self._zerocopy.get(fd)
+                if mask & _EPOLLERR and zerocopy is not None:
+                    # As notificações de conclusão do zero-copy chegam pela fila
+                    # de erros e também sinalizam EPOLLERR.
+                    zerocopy.reap(client_socket)
+                    if client_socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                        mask &= ~_EPOLLERR
 
-            for sock in exceptional:
-                self._close_client(sock)
+                if mask & _EPOLLIN:
+                    self._handle_client_message(client_socket)
+                elif mask & (_EPOLLERR | _EPOLLHUP | _EPOLLRDHUP):
+                    self._close_client(client_socket)
 
     def _accept_new_client(self) -> None:
         """Aceita uma nova conexão de cliente e a registra na lista de clientes."""
         assert self._server_socket is not None
-        client_socket, addr = self._server_socket.accept()
-        client_socket.setblocking(False)
-        self._client_sockets.add(client_socket)
+        assert self._epoll is not None
+        try:
+            if self._accept4 is not None:
+                client_socket, addr = self._accept4.accept(self._server_socket)
+            else:
+                client_socket, addr = self._server_socket.accept()
+                client_socket.setblocking(False)
+        except (BlockingIOError, InterruptedError):
+            return
+        fd = client_socket.fileno()
+        self._client_sockets[fd] = client_socket
+        self._epoll.register(fd, _EPOLLIN | _EPOLLRDHUP)
         print(f"[SERVER] Cliente conectado de {addr[0]}:{addr[1]}")
 
     def _handle_client_message(self, client_socket: socket.socket) -> None:
@@ -99,62 +405,112 @@ class TCPServer:
             client_socket: Socket do cliente a ser lido.
         """
         try:
-            data = client_socket.recv(self.buffer_size)
+            size = client_socket.recv_into(self._rx_view)
         except (BlockingIOError, InterruptedError):
             return
         except ConnectionResetError:
             self._close_client(client_socket)
             return
 
-        if not data:
+        if not size:
             self._close_client(client_socket)
             return
 
-        message = data.decode("utf-8").strip()
+        # A resposta é montada direto dos bytes; só o log precisa decodificar.
+        message = bytes(self._rx_view[:size]).strip()
 
         if not message:
-            response = "Mensagem inválida: mensagem vazia.\n"
+            response = _EMPTY_MSG
             print("[SERVER] Mensagem vazia recebida; ignorando.")
         else:
             peer_ip, peer_port = client_socket.getpeername()
-            print(f"[SERVER] Mensagem de {peer_ip}:{peer_port} -> {message}")
-            response = f"Mensagem recebida: {message}\n"
+            print(f"[SERVER] Mensagem de {peer_ip}:{peer_port} -> {message.decode('utf-8', errors='replace')}")
+            response = _OK_PREFIX + message + _NL
 
         try:
-            client_socket.sendall(response.encode("utf-8"))
+            self._send_bulk(client_socket, response)
         except (BlockingIOError, InterruptedError):
             self._close_client(client_socket)
 
+    def _send_bulk(self, client_socket: socket.socket, payload: bytes) -> None:
+        """Envia o payload ao cliente, usando zero-copy quando compensa.
+
+        Args:
+            client_socket: Socket de destino.
+            payload: Bytes a serem enviados.
+        """
+        if len(payload) < ZEROCOPY_THRESHOLD:
+            client_socket.sendall(payload)
+            return
+
+        fd = client_socket.fileno()
+        if fd not in self._zerocopy:
+            # Só ativa SO_ZEROCOPY em conexões que de fato enviam payloads grandes.
+            self._zerocopy[fd] = _ZeroCopySender.enable(client_socket)
+        zerocopy = self._zerocopy[fd]
+        if zerocopy is None:
+            client_socket.sendall(payload)
+        else:
+            zerocopy.send(client_socket, payload)
+
     def _close_client(self, client_socket: socket.socket) -> None:
         """Fecha a conexão com um cliente específico.
 
         Args:
             client_socket: Socket do cliente que será encerrado.
         """
-        if client_socket in self._client_sockets:
-            self._client_sockets.remove(client_socket)
-        try:
-            client_socket.shutdown(socket.SHUT_RDWR)
-        except OSError:
-            pass
+        fd = client_socket.fileno()
+        self._zerocopy.pop(fd, None)
+        if self._client_sockets.pop(fd, None) is not None and self._epoll is not None:
+            self._epoll.unregister(fd)
+        # close() sozinho já envia o FIN: o socket não é compartilhado com
+        # outros processos, então um shutdown() prévio só custaria uma syscall.
         client_socket.close()
         print("[SERVER] Cliente desconectado.")
 
     def stop(self) -> None:
-        """Encerra o servidor e fecha todos os sockets abertos."""
-        self._running = False
+        """Solicita o encerramento do loop principal, mesmo a partir de outra thread.
 
-        for client_socket in list(self._client_sockets):
-            self._close_client(client_socket)
+        No processo pai, encerra também os workers e aguarda o término deles.
 
-        if self._server_socket is not None:
+        Os sockets são fechados pela própria thread do loop ao sair dele, já
+        que fechá-los aqui poderia remover o aviso de despertar do epoll antes
+        que ele fosse entregue.
+        """
+        self._running = False
+
+        if self._wake_writer is not None:
             try:
-                self._server_socket.shutdown(socket.SHUT_RDWR)
+                self._wake_writer.send(b"\0")
             except OSError:
                 pass
+
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join()
+        self._processes = []
+
+    def _close(self) -> None:
+        """Fecha todos os sockets abertos do worker."""
+        self._running = False
+
+        for client_socket in list(self._client_sockets.values()):
+            self._close_client(client_socket)
+
+        if self._epoll is not None:
+            self._epoll.close()
+            self._epoll = None
+
+        if self._server_socket is not None:
             self._server_socket.close()
             self._server_socket = None
 
+        for wake_socket in (self._wake_reader, self._wake_writer):
+            if wake_socket is not None:
+                wake_socket.close()
+        self._wake_reader = self._wake_writer = None
+
         print("[SERVER] Servidor encerrado.")
 
 
@@ -5,29 +5,197 @@ Autor: Kaique Vieira Miranda
 O servidor recebe mensagens enviadas por clientes na porta configurada e as
 reenvia imediatamente (eco). Cada mensagem recebida é exibida no console e o
 servidor valida o tamanho do datagrama conforme o limite do UDP (65507 bytes).
+O eco é enviado antes de qualquer decodificação: a exibição das mensagens
+fica a cargo de uma thread de log e pode ser desligada com ``verbose=False``.
+
+No Linux os datagramas são recebidos e ecoados em lote com ``recvmmsg(2)`` e
+``sendmmsg(2)`` (via ``ctypes``), amortizando o custo de entrada no kernel
+entre vários pacotes. Nos demais sistemas é usado o laço com ``recvfrom``.
 """
 
 from __future__ import annotations
 
+import ctypes
+import ctypes.util
+import errno
+import os
+import queue
 import socket
-from typing import Final
+import sys
+import threading
+from typing import Final, Optional
 
 MAX_UDP_PAYLOAD: Final[int] = 65507
+BATCH_SIZE: Final[int] = 64
+# Datagramas aguardando exibição; acima disso são descartados do log (não do eco).
+_LOG_QUEUE_SIZE: Final[int] = 256
+
+# Retorna assim que houver ao menos um datagrama, sem esperar o lote completo.
+_MSG_WAITFORONE: Final[int] = 0x10000
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _SockaddrIn(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_uint16),
+        ("sin_addr", ctypes.c_ubyte * 4),
+        ("sin_zero", ctypes.c_ubyte * 8),
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IOVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+class _MmsgBatch:
+    """Estruturas pré-alocadas para ``recvmmsg``/``sendmmsg`` via ``ctypes``.
+
+    Buffers, endereços e cabeçalhos são criados uma única vez e reutilizados
+    a cada chamada, evitando alocações por pacote.
+    """
+
+    def __init__(self, libc: ctypes.CDLL, size: int = BATCH_SIZE) -> None:
+        self._recvmmsg = libc.recvmmsg
+        self._recvmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+        self._recvmmsg.restype = ctypes.c_int
+        self._sendmmsg = libc.sendmmsg
+        self._sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+        self._sendmmsg.restype = ctypes.c_int
+
+        self.size = size
+        self._buffers = [ctypes.create_string_buffer(MAX_UDP_PAYLOAD) for _ in range(size)]
+        self._iovecs = (_IOVec * size)()
+        self._names = (_SockaddrIn * size)()
+        self._incoming = (_MMsgHdr * size)()
+        self._outgoing = (_MMsgHdr * size)()
+        self._received = 0
+        self._queued: list[int] = []
+
+        for i in range(size):
+            self._iovecs[i].iov_base = ctypes.addressof(self._buffers[i])
+            self._iovecs[i].iov_len = MAX_UDP_PAYLOAD
+            hdr = self._incoming[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._names[i])
+            hdr.msg_namelen = ctypes.sizeof(_SockaddrIn)
+            hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+            hdr.msg_iovlen = 1
+            self._outgoing[i].msg_hdr.msg_iovlen = 1
+
+    def recv(self, fd: int) -> int:
+        """Recebe até ``size`` datagramas, bloqueando até chegar o primeiro."""
+        # Restaura apenas o que o lote anterior alterou: o kernel reescreve
+        # msg_namelen dos recebidos e queue_reply encurta iov_len dos ecoados.
+        for i in range(self._received):
+            self._incoming[i].msg_hdr.msg_namelen = ctypes.sizeof(_SockaddrIn)
+        for i in self._queued:
+            self._iovecs[i].iov_len = MAX_UDP_PAYLOAD
+        self._queued.clear()
+        self._received = 0
+
+        count = self._recvmmsg(fd, ctypes.addressof(self._incoming), self.size, _MSG_WAITFORONE, None)
+        if count < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._received = count
+        return count
+
+    def length(self, index: int) -> int:
+        """Retorna o tamanho do datagrama ``index`` sem copiar seu conteúdo."""
+        return self._incoming[index].msg_len
+
+    def datagram(self, index: int) -> tuple[bytes, tuple[str, int]]:
+        """Retorna o conteúdo e o endereço de origem do datagrama ``index``."""
+        length = self._incoming[index].msg_len
+        return ctypes.string_at(self._buffers[index], length), self.address(index)
+
+    def address(self, index: int) -> tuple[str, int]:
+        """Retorna o endereço de origem do datagrama ``index``."""
+        name = self._names[index]
+        return socket.inet_ntoa(bytes(name.sin_addr)), socket.ntohs(name.sin_port)
+
+    def queue_reply(self, index: int) -> None:
+        """Agenda o eco do datagrama ``index`` reaproveitando seu buffer."""
+        iov = self._iovecs[index]
+        iov.iov_len = self._incoming[index].msg_len
+
+        out = self._outgoing[len(self._queued)].msg_hdr
+        out.msg_name = ctypes.addressof(self._names[index])
+        out.msg_namelen = self._incoming[index].msg_hdr.msg_namelen
+        out.msg_iov = ctypes.pointer(iov)
+        self._queued.append(index)
+
+    def flush(self, fd: int) -> list[tuple[tuple[str, int], OSError]]:
+        """Envia os ecos agendados com o menor número de ``sendmmsg``.
+
+        Um destino com erro é pulado sem descartar o restante do lote; as
+        falhas são retornadas com o endereço correspondente.
+        """
+        failures: list[tuple[tuple[str, int], OSError]] = []
+        pending = len(self._queued)
+        sent = 0
+        while sent < pending:
+            first = ctypes.addressof(self._outgoing) + sent * ctypes.sizeof(_MMsgHdr)
+            count = self._sendmmsg(fd, first, pending - sent, 0)
+            if count < 0:
+                err = ctypes.get_errno()
+                if err == errno.EINTR:
+                    continue
+                # O sendmmsg para no primeiro envio que falha: registra e segue.
+                failures.append((self.address(self._queued[sent]), OSError(err, os.strerror(err))))
+                count = 1
+            sent += count
+        return failures
+
+
+def _load_mmsg_batch() -> Optional[_MmsgBatch]:
+    """Cria o lote ``recvmmsg``/``sendmmsg`` quando a plataforma oferece suporte."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        return _MmsgBatch(libc)
+    except (OSError, AttributeError):
+        return None
 
 
 class UDPEchoServer:
     """Servidor UDP simples responsável por ecoar mensagens recebidas."""
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 6000) -> None:
+    def __init__(self, host: str = "127.0.0.1", port: int = 6000, verbose: bool = True) -> None:
         self.host = host
         self.port = port
+        self.verbose = verbose
         self._socket: socket.socket | None = None
+        # Datagramas já ecoados aguardando exibição; None encerra a thread de log.
+        self._log_queue: queue.Queue[Optional[tuple[bytes, tuple[str, int]]]] = queue.Queue(maxsize=_LOG_QUEUE_SIZE)
+        # Só o laço de eco incrementa; a thread de log apenas lê.
+        self._log_dropped = 0
+        self._log_thread: Optional[threading.Thread] = None
 
     def start(self) -> None:
         """Inicializa o socket e entra no loop principal de atendimento."""
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self._socket.bind((self.host, self.port))
         print(f"[SERVER] Servidor UDP escutando em {self.host}:{self.port}")
+        if self.verbose:
+            self._log_thread = threading.Thread(target=self._log_worker, daemon=True)
+            self._log_thread.start()
 
         try:
             self._serve_forever()
@@ -37,35 +205,99 @@ class UDPEchoServer:
             self.stop()
 
     def _serve_forever(self) -> None:
+        batch = _load_mmsg_batch()
+        if batch is not None:
+            self._serve_forever_batched(batch)
+            return
+
         assert self._socket is not None
+        # Um único buffer recebe todos os datagramas; o eco reenvia a própria fatia.
+        rx_view = memoryview(bytearray(MAX_UDP_PAYLOAD))
 
         while True:
             try:
-                data, addr = self._socket.recvfrom(MAX_UDP_PAYLOAD)
+                size, addr = self._socket.recvfrom_into(rx_view)
             except OSError as exc:
                 print(f"[SERVER] Erro ao receber dados: {exc}")
                 continue
 
-            if not data:
+            if not size:
                 print(f"[SERVER] Datagram vazio de {addr}; ignorando.")
                 continue
 
-            if len(data) > MAX_UDP_PAYLOAD:
-                print(f"[SERVER] Mensagem de {addr} excede o limite UDP ({len(data)} bytes)")
+            if size > MAX_UDP_PAYLOAD:
+                print(f"[SERVER] Mensagem de {addr} excede o limite UDP ({size} bytes)")
                 continue
 
-            message = data.decode("utf-8", errors="replace").strip()
-            print(f"[SERVER] Recebido de {addr[0]}:{addr[1]} -> {message}")
+            try:
+                self._socket.sendto(rx_view[:size], addr)
+            except OSError as exc:
+                print(f"[SERVER] Falha ao ecoar para {addr}: {exc}")
+
+            if self.verbose:
+                # Copia antes que o buffer seja reaproveitado pelo próximo datagrama.
+                self._enqueue_log((bytes(rx_view[:size]), addr))
 
+    def _serve_forever_batched(self, batch: _MmsgBatch) -> None:
+        """Mesmo laço de eco, mas recebendo e enviando até ``BATCH_SIZE`` datagramas por syscall."""
+        assert self._socket is not None
+        fd = self._socket.fileno()
+
+        while True:
             try:
-                self._socket.sendto(data, addr)
+                count = batch.recv(fd)
+            except InterruptedError:
+                continue
             except OSError as exc:
+                print(f"[SERVER] Erro ao receber dados: {exc}")
+                continue
+
+            for i in range(count):
+                if not batch.length(i):
+                    print(f"[SERVER] Datagram vazio de {batch.address(i)}; ignorando.")
+                    continue
+                batch.queue_reply(i)
+
+            for addr, exc in batch.flush(fd):
                 print(f"[SERVER] Falha ao ecoar para {addr}: {exc}")
 
+            if self.verbose:
+                # Os buffers continuam válidos até o próximo recv do lote.
+                for i in range(count):
+                    if batch.length(i):
+                        self._enqueue_log(batch.datagram(i))
+
+    def _enqueue_log(self, item: tuple[bytes, tuple[str, int]]) -> None:
+        """Entrega um datagrama à thread de log sem nunca bloquear o eco."""
+        try:
+            self._log_queue.put_nowait(item)
+        except queue.Full:
+            self._log_dropped += 1
+
+    def _log_worker(self) -> None:
+        """Decodifica e exibe os datagramas ecoados fora do laço de eco."""
+        reported = 0
+        while True:
+            item = self._log_queue.get()
+            dropped = self._log_dropped - reported
+            if dropped:
+                reported += dropped
+                print(f"[SERVER] {dropped} mensagens não exibidas (log sobrecarregado)")
+            if item is None:
+                break
+            data, addr = item
+            message = data.decode("utf-8", errors="replace").strip()
+            print(f"[SERVER] Recebido de {addr[0]}:{addr[1]} -> {message}")
+
     def stop(self) -> None:
         if self._socket is not None:
             self._socket.close()
             self._socket = None
+        if self._log_thread is not None:
+            # Exibe o que ainda estiver na fila antes de encerrar.
+            self._log_queue.put(None)
+            self._log_thread.join()
+            self._log_thread = None
         print("[SERVER] Socket fechado.")
 
 
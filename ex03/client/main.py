@@ -11,7 +11,9 @@ from __future__ import annotations
 
 import socket
 import threading
-from typing import Optional
+from typing import Final, Optional
+
+_NL: Final[bytes] = b"\n"
 
 
 class ChatClient:
@@ -73,8 +75,15 @@ class ChatClient:
 
     def _send_message(self, message: str) -> None:
         assert self._socket is not None
+        payload = message.encode("utf-8")
         try:
-            self._socket.sendall((message + "\n").encode("utf-8"))
+            if hasattr(self._socket, "sendmsg"):
+                # Mensagem e quebra de linha seguem em uma única escrita gather.
+                sent = self._socket.sendmsg([payload, _NL])
+                if sent < len(payload) + len(_NL):
+                    self._socket.sendall((payload + _NL)[sent:])
+            else:
+                self._socket.sendall(payload + _NL)
         except OSError as exc:
             print(f"[CLIENT] Erro ao enviar dados: {exc}")
             self._running.clear()
@@ -3,16 +3,55 @@
 Autor: Kaique Vieira Miranda
 
 O servidor aceita no máximo dois clientes simultâneos e retransmite mensagens
-recebidas de um cliente para o outro em tempo real. Cada cliente é atendido em
-uma thread dedicada e o comando "sair" encerra a sessão do remetente.
+recebidas de um cliente para o outro em tempo real. Todas as conexões são
+atendidas por um único laço de eventos com ``selectors``, sem threads nem
+locks, e o comando "sair" encerra a sessão do remetente.
+
+No Linux, as mensagens comuns são repassadas com ``os.splice`` através de um
+pipe, sem que os bytes voltem ao espaço de usuário para serem reenviados.
 """
 
 from __future__ import annotations
 
+import os
+import selectors
 import socket
-import threading
-import time
-from typing import Optional
+from typing import Final, Optional
+
+# Capacidade padrão de um pipe no Linux; limita cada etapa do splice.
+_PIPE_CAPACITY: Final[int] = 65536
+
+_NL: Final[bytes] = b"\n"
+
+
+def _sendmsg_all(sock: socket.socket, parts: list[bytes]) -> None:
+    """Envia as partes em uma escrita gather, retomando envios parciais.
+
+    Sem ``sendmsg`` (Windows), concatena as partes e usa ``sendall``.
+    """
+    if not hasattr(sock, "sendmsg"):
+        sock.sendall(b"".join(parts))
+        return
+
+    views = [memoryview(part) for part in parts]
+    while views:
+        sent = sock.sendmsg(views)
+        while views and sent >= len(views[0]):
+            sent -= len(views.pop(0))
+        if sent:
+            views[0] = views[0][sent:]
+
+
+class _ChatPeer:
+    """Estado de um cliente conectado ao chat."""
+
+    __slots__ = ("sock", "label", "prefix")
+
+    def __init__(self, sock: socket.socket, label: str) -> None:
+        self.sock = sock
+        self.label = label
+        # Prefixo das mensagens repassadas, codificado uma vez por conexão.
+        self.prefix = f"{label}: ".encode("utf-8")
 
 
 class ChatServer:
@@ -24,8 +63,15 @@ class ChatServer:
         self.buffer_size = buffer_size
 
         self._server_socket: Optional[socket.socket] = None
-        self._clients: dict[threading.Thread, socket.socket] = {}
-        self._lock = threading.Lock()
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._wake_reader: Optional[socket.socket] = None
+        self._wake_writer: Optional[socket.socket] = None
+        # Clientes conectados, indexados pelo descritor do socket.
+        self._peers: dict[int, _ChatPeer] = {}
+        # Como todo o atendimento ocorre na thread do laço, o buffer de leitura
+        # e o pipe do splice são compartilhados entre as conexões.
+        self._rx_view = memoryview(bytearray(buffer_size))
+        self._relay_pipe: Optional[tuple[int, int]] = None
         self._running = False
 
     def start(self) -> None:
@@ -33,115 +79,238 @@ class ChatServer:
         self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self._server_socket.bind((self.host, self.port))
         self._server_socket.listen(2)
+
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._server_socket, selectors.EVENT_READ)
+        # O par de sockets permite que stop() acorde o seletor, que espera sem timeout.
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._selector.register(self._wake_reader, selectors.EVENT_READ)
+        if hasattr(os, "splice"):
+            self._relay_pipe = os.pipe()
         self._running = True
 
         print(f"[SERVER] Aguardando até 2 clientes em {self.host}:{self.port}")
 
         try:
-            self._accept_loop()
+            self._serve_forever()
         except KeyboardInterrupt:
             print("\n[SERVER] Encerrado pelo usuário.")
         finally:
-            self.stop()
+            self._close()
 
-    def _accept_loop(self) -> None:
-        assert self._server_socket is not None
+    def _serve_forever(self) -> None:
+        assert self._selector is not None
+        assert self._wake_reader is not None
 
         while self._running:
-            with self._lock:
-                full = len(self._clients) >= 2
+            for key, _ in self._selector.select():
+                if key.fileobj is self._wake_reader:
+                    self._wake_reader.recv(1)
+                    break
+
+                if key.fileobj is self._server_socket:
+                    self._accept_client()
+                    continue
 
-            if full:
-                # Aguarda liberação de slot antes de aceitar outro cliente.
-                time.sleep(0.2)
-                continue
+                # O cliente pode ter saído durante um evento anterior do mesmo lote.
+                peer = self._peers.get(key.fd)
+                if peer is not None and peer.sock is key.fileobj:
+                    self._handle_client(peer)
 
-            try:
-                client_socket, addr = self._server_socket.accept()
-            except OSError:
-                break
+    def _accept_client(self) -> None:
+        assert self._server_socket is not None
+        assert self._selector is not None
 
-            with self._lock:
-                if len(self._clients) >= 2:
-                    print(f"[SERVER] Conexão recusada de {addr}: limite atingido.")
-                    client_socket.sendall(b"Servidor cheio, tente novamente mais tarde.\n")
-                    client_socket.close()
-                    continue
+        try:
+            client_socket, addr = self._server_socket.accept()
+        except OSError:
+            return
 
-                handler = threading.Thread(
-                    target=self._handle_client,
-                    args=(client_socket, addr),
-                    daemon=True,
-                )
-                self._clients[handler] = client_socket
-                handler.start()
-                print(f"[SERVER] Cliente conectado: {addr[0]}:{addr[1]}")
+        peer = _ChatPeer(client_socket, f"{addr[0]}:{addr[1]}")
+        self._peers[client_socket.fileno()] = peer
+        self._selector.register(client_socket, selectors.EVENT_READ)
+        if len(self._peers) >= 2:
+            # Deixa as próximas conexões na fila do listen até uma vaga ser liberada.
+            self._selector.unregister(self._server_socket)
+        print(f"[SERVER] Cliente conectado: {peer.label}")
 
-    def _handle_client(self, client_socket: socket.socket, addr: tuple[str, int]) -> None:
-        peer_label = f"{addr[0]}:{addr[1]}"
-        client_socket.sendall(b"Bem-vindo ao chat! Digite 'sair' para encerrar.\n")
+        try:
+            client_socket.sendall(b"Bem-vindo ao chat! Digite 'sair' para encerrar.\n")
+        except OSError:
+            self._disconnect_client(peer)
+
+    def _handle_client(self, peer: _ChatPeer) -> None:
+        """Trata uma mensagem do cliente, chamado quando seu socket fica legível."""
+        client_socket = peer.sock
+        rx_view = self._rx_view
 
         try:
-            while self._running:
-                data = client_socket.recv(self.buffer_size)
-                if not data:
-                    break
+            # Com splice, apenas espia os bytes: mensagens comuns são movidas
+            # pelo kernel direto para o destinatário.
+            flags = socket.MSG_PEEK if self._relay_pipe is not None else 0
+            size = client_socket.recv_into(rx_view, 0, flags)
+            if not size:
+                self._disconnect_client(peer)
+                return
 
-                message = data.decode("utf-8", errors="replace").strip()
-                if not message:
-                    client_socket.sendall(b"Mensagem vazia ignorada.\n")
-                    continue
+            data = rx_view[:size]
+            message = str(data, "utf-8", errors="replace").strip()
+            is_chat = bool(message) and message.lower() != "sair"
+            if is_chat:
+                print(f"[SERVER] {peer.label}: {message}")
 
-                if message.lower() == "sair":
-                    client_socket.sendall(b"Encerrando a sessao. Ate logo!\n")
-                    break
+            if self._relay_pipe is not None:
+                if is_chat and self._splice_message(peer, bytes(data)):
+                    return
+                # Consome os bytes que foram apenas espiados.
+                client_socket.recv_into(rx_view, size)
 
-                print(f"[SERVER] {peer_label}: {message}")
-                self._relay_message(client_socket, peer_label, message)
-        except ConnectionError:
-            print(f"[SERVER] Conexao perdida com {peer_label}")
-        finally:
-            self._disconnect_client(client_socket)
-            print(f"[SERVER] Cliente {peer_label} desconectado.")
+            if not message:
+                client_socket.sendall(b"Mensagem vazia ignorada.\n")
+                return
 
-    def _relay_message(self, sender_socket: socket.socket, sender_label: str, message: str) -> None:
-        """Envia a mensagem para o outro cliente conectado."""
-        with self._lock:
-            recipients = [sock for sock in self._clients.values() if sock is not sender_socket]
+            if message.lower() == "sair":
+                client_socket.sendall(b"Encerrando a sessao. Ate logo!\n")
+                self._disconnect_client(peer)
+                return
 
+            self._relay_message(peer, bytes(data).strip())
+        except OSError:
+            # Uma falha aqui não pode derrubar o laço que atende os demais clientes.
+            print(f"[SERVER] Conexao perdida com {peer.label}")
+            self._disconnect_client(peer)
+
+    def _splice_message(self, sender: _ChatPeer, data: bytes) -> bool:
+        """Move a mensagem espiada em ``data`` ao outro cliente via ``os.splice``.
+
+        Os espaços nas pontas são consumidos com ``recv`` e apenas o conteúdo
+        passa pelo pipe, seguido de ``_NL``, no mesmo formato de
+        ``_relay_message``. Retorna ``False`` sem consumir nada quando não há
+        exatamente um destinatário. Erros do remetente são propagados; erros
+        do destinatário apenas o desconectam.
+        """
+        recipients = [peer for peer in self._peers.values() if peer is not sender]
+        if len(recipients) != 1:
+            return False
+
+        assert self._relay_pipe is not None
+        sender_socket = sender.sock
+        recipient = recipients[0]
+        pipe_read, pipe_write = self._relay_pipe
+        stripped = data.lstrip()
+        leading = len(data) - len(stripped)
+        remaining = len(stripped.rstrip())
+        trailing = len(stripped) - remaining
+
+        if leading:
+            sender_socket.recv(leading)
+
+        recipient_ok = True
+        try:
+            # MSG_MORE e SPLICE_F_MORE seguram os dados até o _NL final, para
+            # que prefixo, conteúdo e quebra de linha saiam no mesmo segmento.
+            recipient.sock.sendall(sender.prefix, socket.MSG_MORE)
+        except OSError:
+            recipient_ok = False
+
+        while remaining:
+            chunk = os.splice(sender_socket.fileno(), pipe_write, min(remaining, _PIPE_CAPACITY))
+            remaining -= chunk
+            if recipient_ok:
+                try:
+                    while chunk:
+                        chunk -= os.splice(pipe_read, recipient.sock.fileno(), chunk, flags=os.SPLICE_F_MORE)
+                except OSError:
+                    recipient_ok = False
+            # Esvazia o que não chegou ao destinatário para não contaminar a próxima mensagem.
+            while chunk:
+                chunk -= len(os.read(pipe_read, chunk))
+
+        if trailing:
+            sender_socket.recv(trailing)
+
+        if recipient_ok:
+            try:
+                recipient.sock.sendall(_NL)
+            except OSError:
+                recipient_ok = False
+        if not recipient_ok:
+            self._disconnect_client(recipient)
+        return True
+
+    def _relay_message(self, sender: _ChatPeer, body: bytes) -> None:
+        """Envia a mensagem para o outro cliente conectado.
+
+        O prefixo do remetente já está codificado e ``body`` são os bytes
+        recebidos, sem passar por decode/encode.
+        """
+        recipients = [peer for peer in self._peers.values() if peer is not sender]
         if not recipients:
-            sender_socket.sendall(b"Nenhum outro cliente conectado no momento.\n")
+            sender.sock.sendall(b"Nenhum outro cliente conectado no momento.\n")
             return
 
-        payload = f"{sender_label}: {message}\n".encode("utf-8")
-        for sock in recipients:
+        # Cada destinatário recebe prefixo, corpo e quebra de linha em um único
+        # sendmsg, sem concatená-los em espaço de usuário.
+        parts = [sender.prefix, body, _NL]
+        for peer in recipients:
             try:
-                sock.sendall(payload)
+                _sendmsg_all(peer.sock, parts)
             except OSError:
-                self._disconnect_client(sock)
+                self._disconnect_client(peer)
 
-    def _disconnect_client(self, client_socket: socket.socket) -> None:
-        with self._lock:
-            threads_to_remove = [thr for thr, sock in self._clients.items() if sock is client_socket]
-            for thr in threads_to_remove:
-                self._clients.pop(thr, None)
+    def _disconnect_client(self, peer: _ChatPeer) -> None:
+        assert self._selector is not None
+        fd = peer.sock.fileno()
+        if self._peers.get(fd) is not peer:
+            return
 
-        try:
-            client_socket.shutdown(socket.SHUT_RDWR)
-        except OSError:
-            pass
-        client_socket.close()
+        del self._peers[fd]
+        self._selector.unregister(peer.sock)
+        if self._running and len(self._peers) == 1:
+            # Um dos dois clientes saiu: volta a aceitar conexões.
+            self._selector.register(self._server_socket, selectors.EVENT_READ)
+
+        # close() sozinho já envia o FIN; o shutdown() prévio seria uma syscall a mais.
+        peer.sock.close()
+        print(f"[SERVER] Cliente {peer.label} desconectado.")
 
     def stop(self) -> None:
+        """Solicita o encerramento do laço de eventos, mesmo a partir de outra thread."""
+        self._running = False
+
+        if self._wake_writer is not None:
+            try:
+                self._wake_writer.send(b"\0")
+            except OSError:
+                pass
+
+    def _close(self) -> None:
+        """Desconecta os clientes e libera os recursos do laço de eventos."""
         self._running = False
-        for sock in list(self._clients.values()):
-            self._disconnect_client(sock)
+
+        for peer in list(self._peers.values()):
+            self._disconnect_client(peer)
+
+        if self._relay_pipe is not None:
+            for fd in self._relay_pipe:
+                os.close(fd)
+            self._relay_pipe = None
+
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
 
         if self._server_socket is not None:
             try:
                 self._server_socket.close()
             finally:
                 self._server_socket = None
+
+        for wake_socket in (self._wake_reader, self._wake_writer):
+            if wake_socket is not None:
+                wake_socket.close()
+        self._wake_reader = self._wake_writer = None
+
         print("[SERVER] Servidor finalizado.")
 
 
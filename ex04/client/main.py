@@ -4,32 +4,47 @@ Autor: Kaique Vieira Miranda
 
 O cliente conecta-se ao servidor de hora, envia uma solicitação simples e exibe
 no console a resposta recebida. Erros de conexão são tratados e informados.
+
+As conexões ficam em um pool compartilhado entre as instâncias: após uma
+resposta completa o socket volta ao pool, e solicitações seguintes ao mesmo
+servidor o reaproveitam sem repetir o handshake TCP.
 """
 
 from __future__ import annotations
 
+import queue
 import socket
-from typing import Optional
+from typing import Final, Optional
+
+# Máximo de conexões ociosas guardadas por servidor.
+POOL_SIZE: Final[int] = 16
 
 
 class TimeClient:
     """Cliente TCP simples que requisita a hora ao servidor."""
 
+    # Conexões ociosas por (host, porta), compartilhadas entre as instâncias.
+    _pools: dict[tuple[str, int], queue.Queue[socket.socket]] = {}
+
     def __init__(self, host: str = "127.0.0.1", port: int = 7000) -> None:
         self.host = host
         self.port = port
         self._socket: Optional[socket.socket] = None
 
+    def __enter__(self) -> TimeClient:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
     def request_time(self) -> None:
         try:
-            self._connect()
-            assert self._socket is not None
-            self._socket.sendall(b"hora\n")
-            response = self._socket.recv(1024)
+            response = self._exchange()
             if not response:
                 print("[CLIENT] Nenhuma resposta do servidor.")
                 return
             print(f"[CLIENT] Hora recebida: {response.decode('utf-8').strip()}")
+            self._release()
         except ConnectionError as exc:
             print(exc)
         except OSError as exc:
@@ -37,6 +52,60 @@ class TimeClient:
         finally:
             self.stop()
 
+    def _exchange(self) -> bytes:
+        """Envia a solicitação e lê a resposta, terminada em ``\\n``.
+
+        Uma conexão reaproveitada pode ter sido fechada pelo servidor enquanto
+        estava ociosa; nesse caso a solicitação é repetida uma vez em uma
+        conexão nova.
+        """
+        reused = self._acquire()
+        try:
+            response = self._send_request()
+        except (ConnectionResetError, BrokenPipeError):
+            if not reused:
+                raise
+            response = b""
+        if response or not reused:
+            return response
+
+        self.stop()
+        self._connect()
+        return self._send_request()
+
+    def _send_request(self) -> bytes:
+        assert self._socket is not None
+        self._socket.sendall(b"hora\n")
+        response = b""
+        while not response.endswith(b"\n"):
+            chunk = self._socket.recv(1024)
+            if not chunk:
+                break
+            response += chunk
+        return response
+
+    def _acquire(self) -> bool:
+        """Obtém uma conexão do pool ou abre uma nova; retorna se foi reaproveitada."""
+        try:
+            self._socket = self._pool().get_nowait()
+            return True
+        except queue.Empty:
+            self._connect()
+            return False
+
+    def _release(self) -> None:
+        """Devolve a conexão ao pool, fechando-a se o pool estiver cheio."""
+        if self._socket is None:
+            return
+        try:
+            self._pool().put_nowait(self._socket)
+        except queue.Full:
+            return
+        self._socket = None
+
+    def _pool(self) -> queue.Queue[socket.socket]:
+        return self._pools.setdefault((self.host, self.port), queue.Queue(POOL_SIZE))
+
     def _connect(self) -> None:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
@@ -44,8 +113,20 @@ class TimeClient:
         except OSError as exc:
             sock.close()
             raise ConnectionError(f"[CLIENT] Nao foi possivel conectar: {exc}") from exc
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
         self._socket = sock
 
+    @classmethod
+    def close_pool(cls) -> None:
+        """Fecha todas as conexões ociosas guardadas no pool."""
+        for pool in cls._pools.values():
+            while True:
+                try:
+                    sock = pool.get_nowait()
+                except queue.Empty:
+                    break
+                sock.close()
+
     def stop(self) -> None:
         if self._socket is not None:
             try:
@@ -57,4 +138,7 @@ class TimeClient:
 
 
 if __name__ == "__main__":
-    TimeClient().request_time()
+    try:
+        TimeClient().request_time()
+    finally:
+        TimeClient.close_pool()
@@ -1,31 +1,117 @@
-"""Servidor de hora multithread para o Exercício 4 de Redes II.
+"""Servidor de hora assíncrono para o Exercício 4 de Redes II.
 
 Autor: Kaique Vieira Miranda
 
-O servidor atende múltiplos clientes simultaneamente, enviando a hora atual no
-formato HH:MM:SS para cada solicitação recebida. Cada acesso gera logs
-informando o cliente e o horário atendido.
+O servidor atende múltiplos clientes simultaneamente em um único laço de
+eventos ``asyncio``, enviando a hora atual no formato HH:MM:SS para cada
+linha de solicitação recebida. A conexão permanece aberta para novas
+solicitações até que o cliente a encerre. Cada acesso gera logs informando o cliente e o horário
+atendido.
+
+Como cada solicitação é independente, o servidor pode iniciar vários
+processos escutando na mesma porta com ``SO_REUSEPORT``, deixando o kernel
+distribuir as conexões entre eles.
 """
 
 from __future__ import annotations
 
-import datetime as dt
+import asyncio
+import contextlib
+import ctypes
+import ctypes.util
 import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import signal
 import socket
-import threading
-from typing import Optional
+import sys
+import time
+from typing import Final, Iterator, Optional
+
+# A resposta tem formato fixo, então ela é montada de dois pedaços pré-codificados:
+# "HH:MM:" indexado por hora * 60 + minuto e "SS\n" indexado pelo segundo
+# (tm_sec chega a 60 em segundos bissextos). Uma única concatenação, sem strftime.
+_HOUR_MINUTE: Final[tuple[bytes, ...]] = tuple(
+    f"{hour:02d}:{minute:02d}:".encode("ascii") for hour in range(24) for minute in range(60)
+)
+_SECOND_NL: Final[tuple[bytes, ...]] = tuple(f"{second:02d}\n".encode("ascii") for second in range(61))
+
+
+class _RecordQueueHandler(logging.handlers.QueueHandler):
+    """Enfileira o ``LogRecord`` intacto, deixando a formatação para o listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # O listener roda no mesmo processo, então o registro não precisa ser
+        # formatado nem tornado serializável antes de entrar na fila.
+        return record
+
+
+@contextlib.contextmanager
+def _queued_logging() -> Iterator[None]:
+    """Durante o bloco, os handlers do logger raiz rodam em uma thread dedicada.
+
+    No laço de eventos, cada chamada de ``logging`` apenas enfileira o
+    registro; formatação e escrita no terminal ficam com o ``QueueListener``.
+    """
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    root.handlers = [_RecordQueueHandler(log_queue)]
+    listener.start()
+    try:
+        yield
+    finally:
+        # Escreve os registros pendentes antes de devolver os handlers originais.
+        listener.stop()
+        root.handlers = handlers
+
+
+# Valor de PR_SET_PDEATHSIG em <linux/prctl.h>.
+_PR_SET_PDEATHSIG: Final[int] = 1
+
+
+def _die_with_parent(parent_pid: int) -> bool:
+    """Faz o kernel enviar SIGTERM ao worker quando o processo pai morrer.
+
+    Retorna ``False`` se o pai já não existe, pois nesse caso o pedido
+    chegou tarde demais e o worker deve sair por conta própria.
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.prctl(_PR_SET_PDEATHSIG, signal.SIGTERM, 0, 0, 0)
+    except (OSError, AttributeError):
+        pass
+    return os.getppid() == parent_pid
+
+
+def _available_cpus() -> list[int]:
+    """Retorna os identificadores das CPUs disponíveis para o processo."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
 
 
 class TimeServer:
     """Servidor TCP que retorna a hora atual para cada cliente."""
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 7000, buffer_size: int = 1024) -> None:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 7000,
+        buffer_size: int = 1024,
+        workers: Optional[int] = None,
+    ) -> None:
         self.host = host
         self.port = port
         self.buffer_size = buffer_size
+        self.workers = workers if workers is not None else len(_available_cpus())
 
-        self._server_socket: Optional[socket.socket] = None
-        self._running = False
+        self._server: Optional[asyncio.Server] = None
+        self._processes: list[multiprocessing.Process] = []
+        self._parent_pid = os.getpid()
 
         logging.basicConfig(
             level=logging.INFO,
@@ -34,59 +120,126 @@ class TimeServer:
         )
 
     def start(self) -> None:
-        """Inicializa o servidor e aguarda conexões."""
-        self._server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self._server_socket.bind((self.host, self.port))
-        self._server_socket.listen()
-        self._running = True
-        logging.info("Servidor de hora escutando em %s:%s", self.host, self.port)
-
+        """Inicializa o servidor e aguarda conexões.
+
+        Com mais de um worker, cada processo abre o próprio socket de escuta
+        com ``SO_REUSEPORT``; fora do Linux, roda em um único processo.
+        """
+        if self.workers > 1 and not sys.platform.startswith("linux"):
+            # Só o Linux balanceia as conexões entre sockets com SO_REUSEPORT;
+            # nos BSDs e no macOS um único socket receberia todas elas.
+            self.workers = 1
+        if self.workers <= 1:
+            self._run_worker(0)
+            return
+
+        # Sem isso, um SIGTERM mataria só o pai e deixaria os workers órfãos
+        # escutando na porta; como KeyboardInterrupt, ele passa por stop().
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        self._parent_pid = os.getpid()
+
+        processes = [
+            multiprocessing.Process(target=self._run_worker, args=(worker_id,), name=f"time-worker-{worker_id}")
+            for worker_id in range(self.workers)
+        ]
         try:
-            while self._running:
-                try:
-                    client_socket, addr = self._server_socket.accept()
-                except OSError:
-                    break
-
-                thread = threading.Thread(target=self._handle_client, args=(client_socket, addr), daemon=True)
-                thread.start()
+            for process in processes:
+                process.start()
+                # Registrado a cada start() para que stop() alcance os workers já
+                # iniciados mesmo se o próximo for interrompido.
+                self._processes.append(process)
+
+            for process in processes:
+                process.join()
         except KeyboardInterrupt:
-            logging.info("Servidor interrompido pelo usuário.")
+            # O Ctrl+C também chega aos workers, que encerram seus próprios sockets.
+            pass
         finally:
             self.stop()
 
-    def _handle_client(self, client_socket: socket.socket, addr: tuple[str, int]) -> None:
+    def _run_worker(self, worker_id: int) -> None:
+        """Executa o laço de eventos do worker até ser interrompido."""
+        if self.workers > 1:
+            # A lista herdada do pai pertence a ele; o worker não a encerra.
+            self._processes = []
+            if not _die_with_parent(self._parent_pid):
+                return
+            if hasattr(os, "sched_setaffinity"):
+                cpus = _available_cpus()
+                os.sched_setaffinity(0, {cpus[worker_id % len(cpus)]})
+
+        with _queued_logging():
+            try:
+                asyncio.run(self._serve(worker_id))
+            except (KeyboardInterrupt, asyncio.CancelledError):
+                logging.info("Servidor interrompido pelo usuário.")
+            finally:
+                self.stop()
+
+    async def _serve(self, worker_id: int) -> None:
+        """Abre o socket de escuta do worker e atende conexões indefinidamente."""
+        self._server = await asyncio.start_server(
+            self._handle_client,
+            self.host,
+            self.port,
+            reuse_port=self.workers > 1,
+            # Tamanho máximo de uma linha de solicitação.
+            limit=self.buffer_size,
+        )
+        logging.info("Worker %s escutando em %s:%s", worker_id, self.host, self.port)
+        if self.workers > 1:
+            # O terminate() do processo pai chega como SIGTERM. Tratado pelo laço,
+            # ele fecha o servidor entre callbacks, em vez de interromper um envio.
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self._server.close)
+
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Responde cada linha recebida com a hora até o cliente fechar a conexão.
+
+        A conexão é mantida aberta entre solicitações para que clientes com
+        pool de conexões evitem um novo handshake a cada consulta.
+        """
+        addr = writer.get_extra_info("peername")
         peer = f"{addr[0]}:{addr[1]}"
         logging.info("Cliente conectado: %s", peer)
+        # Detecta clientes que somem sem encerrar a conexão ociosa.
+        writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
 
+        served = 0
         try:
-            request = client_socket.recv(self.buffer_size)
-            if not request:
-                logging.warning("Solicitação vazia de %s", peer)
-                return
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+
+                now = time.localtime()
+                writer.write(_HOUR_MINUTE[now.tm_hour * 60 + now.tm_min] + _SECOND_NL[now.tm_sec])
+                await writer.drain()
+                served += 1
+                logging.info("Hora %02d:%02d:%02d enviada para %s", now.tm_hour, now.tm_min, now.tm_sec, peer)
 
-            now = dt.datetime.now().strftime("%H:%M:%S")
-            response = f"{now}\n".encode("utf-8")
-            client_socket.sendall(response)
-            logging.info("Hora %s enviada para %s", now, peer)
-        except OSError as exc:
+            if not served:
+                logging.warning("Solicitação vazia de %s", peer)
+        except (OSError, ValueError) as exc:
+            # ValueError: linha acima do limite do StreamReader.
             logging.error("Erro ao atender %s: %s", peer, exc)
         finally:
-            try:
-                client_socket.shutdown(socket.SHUT_RDWR)
-            except OSError:
-                pass
-            client_socket.close()
+            writer.close()
             logging.info("Conexão encerrada com %s", peer)
 
     def stop(self) -> None:
-        self._running = False
-        if self._server_socket is not None:
-            try:
-                self._server_socket.close()
-            finally:
-                self._server_socket = None
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join()
+        self._processes = []
+
         logging.info("Servidor finalizado.")
 
 
@@ -11,73 +11,226 @@ mostradas até o fechamento da conexão.
 from __future__ import annotations
 
 import asyncio
-from websockets.exceptions import ConnectionClosedOK
-from websockets.legacy.client import WebSocketClientProtocol, connect
+import os
+import sys
+import threading
+from typing import Optional
+
+from websockets.asyncio.client import ClientConnection, connect
+from websockets.exceptions import ConnectionClosedError, ConnectionClosedOK
+
+# Intervalo máximo, em segundos, entre a chegada de uma mensagem e sua exibição.
+_FLUSH_INTERVAL = 0.05
 
 
 class WebSocketChatClient:
     """Cliente WebSocket que participa do chat em grupo."""
 
+    _QUIT = "sair"
+
     def __init__(self, uri: str = "ws://127.0.0.1:8765") -> None:
         self.uri = uri
-        self._termination_requested = asyncio.Event()
+        # Linhas digitadas pelo usuário; ``None`` sinaliza o fim da entrada.
+        self._input_queue: asyncio.Queue[Optional[str]] = asyncio.Queue(maxsize=64)
+        self._stdin_buf = bytearray()
+        self._stdin_fd: Optional[int] = None
+        self._stdin_paused = False
+        self._stdin_eof = False
+
+        # Mensagens recebidas vão direto ao buffer binário da saída padrão,
+        # esvaziado no máximo a cada ``_FLUSH_INTERVAL``.
+        self._stdout_write = sys.stdout.buffer.write
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
 
     async def run(self) -> None:
+        self._start_stdin_reader()
         try:
             async with connect(self.uri) as websocket:
-                print(f"[CLIENT] Conectado a {self.uri}. Digite 'sair' para terminar.")
+                print(f"[CLIENT] Conectado a {self.uri}. Digite 'sair' para terminar.", flush=True)
                 await self._chat_loop(websocket)
         except ConnectionRefusedError:
             print(f"[CLIENT] Não foi possível conectar em {self.uri}. Servidor ativo?")
         except OSError as exc:
             print(f"[CLIENT] Erro de conexão: {exc}")
-
-    async def _chat_loop(self, websocket: WebSocketClientProtocol) -> None:
-        receiver = asyncio.create_task(self._receive_messages(websocket))
-        sender = asyncio.create_task(self._send_messages(websocket))
-
-        done, pending = await asyncio.wait(
-            {receiver, sender},
-            return_when=asyncio.FIRST_COMPLETED,
-        )
-
-        for task in pending:
-            task.cancel()
-        await asyncio.gather(*pending, return_exceptions=True)
-
-        for task in done:
-            task.result()
-
-    async def _send_messages(self, websocket: WebSocketClientProtocol) -> None:
-        while not self._termination_requested.is_set():
+        finally:
+            self._stop_stdin_reader()
+
+    def _start_stdin_reader(self) -> None:
+        """Passa a entregar as linhas da entrada padrão em ``_input_queue``.
+
+        Em sistemas POSIX o descritor é registrado uma única vez no laço de
+        eventos, que avisa quando há dados para ler. No Windows, ou quando a
+        entrada não pode ser monitorada (um arquivo regular, por exemplo), uma
+        única thread dedicada faz a leitura bloqueante.
+        """
+        loop = asyncio.get_running_loop()
+        if sys.platform != "win32":
+            fd = sys.stdin.fileno()
             try:
-                message = await asyncio.to_thread(input, "> ")
+                loop.add_reader(fd, self._on_stdin_readable)
+            except (OSError, NotImplementedError):
+                pass
+            else:
+                self._stdin_fd = fd
+                return
+
+        threading.Thread(target=self._stdin_pump, args=(loop,), daemon=True).start()
+
+    def _stop_stdin_reader(self) -> None:
+        self._pause_stdin()
+        self._stdin_fd = None
+
+    def _on_stdin_readable(self) -> None:
+        """Lê o que estiver disponível na entrada e enfileira as linhas completas.
+
+        A leitura vai direto ao descritor com ``os.read``: o buffer interno de
+        ``sys.stdin`` poderia reter linhas já lidas sem que o laço de eventos
+        voltasse a sinalizar o descritor.
+        """
+        assert self._stdin_fd is not None
+        chunk = os.read(self._stdin_fd, 4096)
+
+        if chunk:
+            self._stdin_buf += chunk
+        else:
+            # EOF (Ctrl+D): nada mais a monitorar.
+            self._pause_stdin()
+            self._stdin_eof = True
+        self._drain_stdin_buf()
+
+    def _drain_stdin_buf(self) -> None:
+        """Move linhas completas do buffer para a fila enquanto houver espaço.
+
+        Com a fila cheia o descritor deixa de ser monitorado; ``_send_messages``
+        o registra novamente depois de consumir uma linha. No EOF a última linha
+        sem quebra, se houver, é entregue antes do marcador ``None``.
+        """
+        queue = self._input_queue
+        while not queue.full() and b"\n" in self._stdin_buf:
+            line, _, rest = self._stdin_buf.partition(b"\n")
+            self._stdin_buf = rest
+            queue.put_nowait(line.decode("utf-8", errors="replace"))
+
+        if self._stdin_eof:
+            if self._stdin_buf and not queue.full() and b"\n" not in self._stdin_buf:
+                queue.put_nowait(self._stdin_buf.decode("utf-8", errors="replace"))
+                self._stdin_buf.clear()
+            if not self._stdin_buf and not queue.full():
+                queue.put_nowait(None)
+                self._stdin_fd = None
+        elif queue.full():
+            self._pause_stdin()
+
+    def _pause_stdin(self) -> None:
+        if self._stdin_fd is not None and not self._stdin_paused:
+            asyncio.get_running_loop().remove_reader(self._stdin_fd)
+            self._stdin_paused = True
+
+    def _resume_stdin(self) -> None:
+        """Retoma a leitura suspensa pela fila cheia, se ainda houver entrada."""
+        if self._stdin_fd is None or not self._stdin_paused:
+            return
+        self._drain_stdin_buf()
+        if not self._stdin_eof and not self._input_queue.full():
+            asyncio.get_running_loop().add_reader(self._stdin_fd, self._on_stdin_readable)
+            self._stdin_paused = False
+
+    def _stdin_pump(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Thread de leitura usada quando o laço não monitora a entrada padrão."""
+        while True:
+            try:
+                line: Optional[str] = input()
             except (EOFError, KeyboardInterrupt):
-                message = "sair"
+                line = None
+            try:
+                asyncio.run_coroutine_threadsafe(self._input_queue.put(line), loop).result()
+            except RuntimeError:
+                # Laço de eventos já encerrado.
+                return
+            if line is None:
+                return
+
+    async def _chat_loop(self, websocket: ClientConnection) -> None:
+        # O fechamento da conexão, por "sair" ou pelo servidor, encerra a
+        # recepção; o envio é cancelado em seguida. Uma falha no envio cancela a
+        # recepção pelo próprio TaskGroup.
+        async with asyncio.TaskGroup() as group:
+            sender = group.create_task(self._send_messages(websocket))
+            await self._receive_messages(websocket)
+            sender.cancel()
+
+    async def _send_messages(self, websocket: ClientConnection) -> None:
+        while True:
+            print("> ", end="", flush=True)
+            message = await self._input_queue.get()
+            self._resume_stdin()
+            if message is None:
+                message = self._QUIT
                 print()
 
             message = message.strip()
             if not message:
-                print("[CLIENT] Mensagem vazia ignorada.")
+                print("[CLIENT] Mensagem vazia ignorada.", flush=True)
                 continue
 
             await websocket.send(message)
 
-            if message.lower() == "sair":
-                self._termination_requested.set()
+            if len(message) == len(self._QUIT) and message.lower() == self._QUIT:
                 await websocket.close()
                 break
 
-    async def _receive_messages(self, websocket: WebSocketClientProtocol) -> None:
+    async def _receive_messages(self, websocket: ClientConnection) -> None:
         try:
-            async for message in websocket:
-                print(f"\n{message}")
-                if message.lower().startswith("encerrando sua sessão"):
-                    self._termination_requested.set()
+            while True:
+                # Sem decodificar: o texto em UTF-8 é escrito como chegou.
+                message = await websocket.recv(decode=False)
+                self._show_message(message)
         except ConnectionClosedOK:
             pass
+        except ConnectionClosedError:
+            self._flush_output()
+            print("\n[CLIENT] Conexão com o servidor perdida.")
         finally:
-            self._termination_requested.set()
+            self._flush_output()
+
+    def _show_message(self, message: bytes) -> None:
+        """Escreve a mensagem sem forçar a descarga da saída a cada chamada.
+
+        As mensagens ficam no buffer da saída padrão e são descarregadas juntas
+        por um temporizador, com uma escrita no terminal por lote. As demais
+        mensagens do cliente usam ``print(..., flush=True)`` para que nada
+        fique pendente na camada de texto e fora de ordem com estas.
+        """
+        write = self._stdout_write
+        write(b"\n")
+        write(message)
+        write(b"\n")
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                _FLUSH_INTERVAL, self._flush_output
+            )
+
+    def _flush_output(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        sys.stdout.buffer.flush()
+
+
+def _install_event_loop_policy() -> None:
+    """Ativa o ``uvloop`` quando disponível.
+
+    No Windows a entrada padrão já é lida por uma thread, então basta o laço
+    baseado em ``select`` no lugar do proactor.
+    """
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        return
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 
 async def main() -> None:
@@ -89,4 +242,5 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
+    _install_event_loop_policy()
     asyncio.run(main())
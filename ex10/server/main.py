@@ -6,96 +6,548 @@ O servidor aceita múltiplos clientes, retransmitindo cada mensagem recebida
 para os demais conectados. Cada cliente recebe feedback imediato sobre o
 status de conexão e comandos especiais (como o "sair", que encerra somente a
 sessão de quem o enviou).
+
+Cada cliente tem uma fila de saída própria, esvaziada por uma tarefa
+escritora: o broadcast apenas enfileira a mensagem, e mensagens acumuladas
+são agrupadas em um único envio.
+
+No Linux o servidor inicia um processo por CPU, todos escutando na mesma
+porta com ``SO_REUSEPORT``. Cada mensagem é entregue aos clientes do próprio
+processo e repassada aos demais por sockets UNIX de datagrama.
 """
 
 from __future__ import annotations
 
 import asyncio
-from typing import Set
+import collections
+import ctypes
+import ctypes.util
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+from typing import Optional, Set
+
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.exceptions import ConnectionClosed, ConnectionClosedError, ConnectionClosedOK
+from websockets.protocol import State
+
+# Limite de mensagens pendentes por cliente; acima disso o cliente é desconectado.
+_OUTBOX_SIZE = 64
+# Máximo de mensagens agrupadas em um único envio.
+_BATCH_SIZE = 32
+# Tempo máximo, em segundos, que um envio pode esperar o cliente ler.
+_SEND_TIMEOUT = 5.0
+# Maior datagrama trocado entre workers; cobre o maior quadro aceito.
+_RELAY_BUFSIZE = 1 << 16
+# Mensagens guardadas para um worker cuja fila de recepção está cheia.
+_RELAY_BACKLOG = 1024
+# Valor de PR_SET_PDEATHSIG em <linux/prctl.h>.
+_PR_SET_PDEATHSIG = 1
+
+
+def _available_cpus() -> list[int]:
+    """Retorna os identificadores das CPUs disponíveis para o processo."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _follow_parent(parent_pid: int) -> bool:
+    """Pede ao kernel que envie SIGTERM ao worker quando o pai terminar.
+
+    Um worker órfão continuaria com a porta e o endereço de repasse. Retorna
+    ``False`` se o pai morreu antes do pedido e o worker deve sair.
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.prctl(_PR_SET_PDEATHSIG, signal.SIGTERM, 0, 0, 0)
+    except (OSError, AttributeError):
+        pass
+    return os.getppid() == parent_pid
+
+
+class _ChatClient:
+    """Estado de um cliente conectado: fila de saída e tarefa escritora."""
+
+    __slots__ = ("websocket", "label", "prefix", "outbox", "writer", "index")
+
+    def __init__(self, websocket: ServerConnection, label: str) -> None:
+        self.websocket = websocket
+        self.label = label
+        # Prefixo das mensagens retransmitidas, já codificado uma vez por conexão.
+        self.prefix = f"{label}: ".encode("utf-8")
+        # ``None`` encerra a tarefa escritora depois das mensagens anteriores.
+        self.outbox: asyncio.Queue[Optional[bytes]] = asyncio.Queue(maxsize=_OUTBOX_SIZE)
+        self.writer: Optional[asyncio.Task[None]] = None
+        # Posição em ``WebSocketChatServer._clients``; -1 fora da lista.
+        self.index = -1
+
+
+class _RelayPeer:
+    """Outro worker do servidor e as mensagens que aguardam espaço em sua fila.
+
+    O socket é conectado ao endereço do worker para que o laço de eventos o
+    sinalize como gravável quando a fila do destino voltar a ter espaço; o
+    Linux guarda poucos datagramas por socket UNIX (``net.unix.max_dgram_qlen``).
+    """
+
+    __slots__ = ("address", "sock", "pending", "waiting")
 
-from websockets.exceptions import ConnectionClosedError, ConnectionClosedOK
-from websockets.legacy.server import WebSocketServerProtocol, serve
+    def __init__(self, address: str) -> None:
+        self.address = address
+        self.sock: Optional[socket.socket] = None
+        self.pending: collections.deque[bytes] = collections.deque()
+        # Se o socket está registrado no laço à espera de espaço no destino.
+        self.waiting = False
 
 
 class WebSocketChatServer:
-    """Servidor WebSocket que gerencia um chat em grupo."""
+    """Servidor WebSocket que gerencia um chat em grupo.
+
+    ``_clients`` é uma lista percorrida em ordem a cada broadcast; cada
+    cliente guarda a própria posição, e a remoção troca o último elemento para
+    o lugar vago. A lista é alterada somente na thread do laço de eventos e
+    nenhum trecho que a lê e depois a modifica contém ``await``; por isso
+    dispensa trava.
+    """
+
+    # Comando que encerra a sessão de quem o envia, sem distinção de caixa.
+    _QUIT = "sair"
+
+    # Mensagens do servidor, já em UTF-8; ``%s`` recebe o endereço do cliente.
+    _WELCOME = "Bem-vindo ao chat WebSocket! Digite 'sair' para encerrar.".encode("utf-8")
+    _JOIN_TMPL = b"[SERVER] %s entrou no chat."
+    _LEAVE_TMPL = b"[SERVER] %s saiu do chat."
+
+    # Classificação das mensagens recebidas e a resposta enviada ao emissor em
+    # cada caso, já em UTF-8; mensagens válidas (``_RELAY``) não geram resposta.
+    _RELAY, _EMPTY, _TOO_LONG, _LEAVE = range(4)
+    _FEEDBACK = tuple(
+        text.encode("utf-8")
+        for text in (
+            "",
+            "Mensagem vazia ignorada.",
+            "Mensagem muito longa, tente novamente.",
+            "Encerrando sua sessão. Até logo!",
+        )
+    )
 
     def __init__(
         self,
         host: str = "127.0.0.1",
         port: int = 8765,
         max_message_length: int = 4096,
+        workers: Optional[int] = None,
     ) -> None:
         self.host = host
         self.port = port
         self.max_message_length = max_message_length
+        self.workers = workers if workers is not None else len(_available_cpus())
+
+        self._clients: list[_ChatClient] = []
+        # Fechamentos em andamento de clientes lentos, mantidos até concluírem.
+        self._closing: Set[asyncio.Task[None]] = set()
+        self._processes: list[multiprocessing.Process] = []
+        self._parent_pid = os.getpid()
+
+        # Socket de recepção do repasse entre workers e os demais workers.
+        self._relay: Optional[socket.socket] = None
+        self._relay_peers: list[_RelayPeer] = []
+        # Desmarcado enquanto algum worker está com a fila de recepção cheia.
+        self._relay_ready: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        """Inicia os workers e aguarda até que todos terminem.
+
+        Com mais de um worker, cada processo abre o próprio socket de escuta
+        com ``SO_REUSEPORT``; fora do Linux, roda em um único processo.
+        """
+        if self.workers > 1 and not sys.platform.startswith("linux"):
+            # Só o Linux balanceia as conexões entre sockets com SO_REUSEPORT,
+            # e o repasse usa o espaço de nomes abstrato de sockets UNIX.
+            self.workers = 1
+        if self.workers <= 1:
+            self._run_worker(0)
+            return
 
-        self._clients: Set[WebSocketServerProtocol] = set()
-        self._lock = asyncio.Lock()
+        # Tratado como Ctrl+C, o SIGTERM no pai passa por stop(); do contrário
+        # os workers ficariam órfãos, presos à porta e aos endereços de repasse.
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        self._parent_pid = os.getpid()
+
+        processes = [
+            multiprocessing.Process(target=self._run_worker, args=(worker_id,), name=f"chat-worker-{worker_id}")
+            for worker_id in range(self.workers)
+        ]
+        try:
+            for process in processes:
+                process.start()
+                # Registrado a cada start() para que stop() alcance os workers já
+                # iniciados mesmo se o próximo for interrompido.
+                self._processes.append(process)
+
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # O Ctrl+C também chega aos workers, que encerram seus próprios sockets.
+            pass
+        finally:
+            self.stop()
+
+    def _run_worker(self, worker_id: int) -> None:
+        """Executa o laço de eventos do worker até ser interrompido."""
+        if self.workers > 1:
+            # A lista herdada do pai pertence a ele; o worker não a encerra.
+            self._processes = []
+            if not _follow_parent(self._parent_pid):
+                return
+            if hasattr(os, "sched_setaffinity"):
+                cpus = _available_cpus()
+                os.sched_setaffinity(0, {cpus[worker_id % len(cpus)]})
+
+        try:
+            asyncio.run(self.run(worker_id))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            print("\n[SERVER] Encerrado pelo usuário.")
+        finally:
+            self.stop()
 
-    async def run(self) -> None:
+    async def run(self, worker_id: int = 0) -> None:
         """Inicia o servidor e o mantém ativo até ser interrompido."""
-        async with serve(self._handle_client, self.host, self.port):
-            print(f"[SERVER] Escutando WebSockets em ws://{self.host}:{self.port}")
-            await asyncio.Future()
-
-    async def _register(self, websocket: WebSocketServerProtocol, peer_label: str) -> None:
-        async with self._lock:
-            self._clients.add(websocket)
-        await websocket.send("Bem-vindo ao chat WebSocket! Digite 'sair' para encerrar.")
-        await self._broadcast(f"[SERVER] {peer_label} entrou no chat.", sender=None)
+        if self.workers > 1:
+            self._open_relay(worker_id)
+        # Sem permessage-deflate: as mensagens são textos curtos e cada conexão
+        # economiza os contextos zlib de envio e recepção. ``max_size`` (em
+        # bytes) admite o pior caso UTF-8 de ``max_message_length`` caracteres;
+        # acima disso a biblioteca recusa o quadro antes de montá-lo.
+        async with serve(
+            self._handle_client,
+            self.host,
+            self.port,
+            compression=None,
+            max_size=4 * self.max_message_length,
+            max_queue=32,
+            reuse_port=self.workers > 1,
+        ) as server:
+            if self.workers > 1:
+                print(f"[SERVER] Worker {worker_id} escutando WebSockets em ws://{self.host}:{self.port}")
+                # O terminate() do processo pai chega como SIGTERM; o laço fecha o
+                # servidor entre callbacks.
+                asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, server.close)
+            else:
+                print(f"[SERVER] Escutando WebSockets em ws://{self.host}:{self.port}")
+            await server.serve_forever()
+
+    def _relay_address(self, worker_id: int) -> str:
+        # Endereço no espaço de nomes abstrato: não cria arquivo no disco.
+        return f"\0redes-ii-ex10-{self.port}-{worker_id}"
+
+    def _open_relay(self, worker_id: int) -> None:
+        """Abre o socket que troca mensagens com os demais workers."""
+        relay = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        relay.setblocking(False)
+        relay.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        relay.bind(self._relay_address(worker_id))
+        self._relay = relay
+        self._relay_ready = asyncio.Event()
+        self._relay_ready.set()
+        self._relay_peers = [
+            _RelayPeer(self._relay_address(peer)) for peer in range(self.workers) if peer != worker_id
+        ]
+        asyncio.get_running_loop().add_reader(relay.fileno(), self._on_relay_readable)
+
+    def _on_relay_readable(self) -> None:
+        """Entrega aos clientes locais as mensagens repassadas por outros workers."""
+        assert self._relay is not None
+        while True:
+            try:
+                payload = self._relay.recv(_RELAY_BUFSIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            self._fanout(payload, sender=None)
+
+    def _relay_to_workers(self, payload: bytes) -> None:
+        """Repassa ``payload`` aos demais workers, sem esperar por eles.
+
+        Enquanto a fila de um worker está cheia, as mensagens aguardam em
+        ``pending``, até ``_RELAY_BACKLOG``; além disso são descartadas, como
+        aconteceria com um cliente lento. Um worker que ainda não abriu seu
+        socket ou já terminou também perde a mensagem.
+        """
+        for peer in self._relay_peers:
+            if peer.waiting:
+                if len(peer.pending) < _RELAY_BACKLOG:
+                    peer.pending.append(payload)
+                continue
+            if peer.sock is None and not self._connect_relay_peer(peer):
+                continue
+            peer.pending.append(payload)
+            self._flush_relay_peer(peer)
+
+    @staticmethod
+    def _connect_relay_peer(peer: _RelayPeer) -> bool:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        try:
+            sock.connect(peer.address)
+        except (ConnectionRefusedError, FileNotFoundError):
+            sock.close()
+            return False
+        peer.sock = sock
+        return True
+
+    def _flush_relay_peer(self, peer: _RelayPeer) -> None:
+        """Envia as mensagens pendentes até esvaziar ``pending`` ou encher a fila do worker."""
+        assert peer.sock is not None
+        loop = asyncio.get_running_loop()
+        while peer.pending:
+            try:
+                peer.sock.send(peer.pending[0])
+            except BlockingIOError:
+                if not peer.waiting:
+                    loop.add_writer(peer.sock.fileno(), self._flush_relay_peer, peer)
+                    peer.waiting = True
+                    assert self._relay_ready is not None
+                    self._relay_ready.clear()
+                return
+            except ConnectionRefusedError:
+                # O worker terminou; reconecta na próxima mensagem.
+                peer.pending.clear()
+                self._stop_waiting(peer)
+                peer.sock.close()
+                peer.sock = None
+                return
+            peer.pending.popleft()
+
+        self._stop_waiting(peer)
+
+    def _stop_waiting(self, peer: _RelayPeer) -> None:
+        if not peer.waiting:
+            return
+        assert peer.sock is not None and self._relay_ready is not None
+        asyncio.get_running_loop().remove_writer(peer.sock.fileno())
+        peer.waiting = False
+        if not any(other.waiting for other in self._relay_peers):
+            self._relay_ready.set()
+
+    def _register(self, websocket: ServerConnection, peer_label: str) -> _ChatClient:
+        client = _ChatClient(websocket, peer_label)
+        client.writer = asyncio.create_task(self._client_writer(client))
+        client.index = len(self._clients)
+        self._clients.append(client)
+        self._send_to(client, self._WELCOME)
+        self._broadcast_bytes(self._JOIN_TMPL % peer_label.encode("utf-8"), sender=None)
         print(f"[SERVER] Cliente conectado: {peer_label}. Total: {len(self._clients)}")
+        return client
+
+    def _unregister(self, client: _ChatClient) -> None:
+        self._remove_client(client)
+        self._broadcast_bytes(self._LEAVE_TMPL % client.label.encode("utf-8"), sender=None)
+        print(f"[SERVER] Cliente desconectado: {client.label}. Total: {len(self._clients)}")
+
+    def _remove_client(self, client: _ChatClient) -> None:
+        """Tira o cliente da lista em O(1) e encerra sua tarefa escritora."""
+        index = client.index
+        if index < 0:
+            return
+        last = self._clients.pop()
+        if last is not client:
+            self._clients[index] = last
+            last.index = index
+        client.index = -1
+        if client.writer is not None:
+            client.writer.cancel()
+
+    def _broadcast_bytes(self, payload: bytes, sender: ServerConnection | None) -> None:
+        """Entrega ``payload`` aos clientes deste worker e o repassa aos demais."""
+        self._fanout(payload, sender)
+        self._relay_to_workers(payload)
+
+    def _fanout(self, payload: bytes, sender: ServerConnection | None) -> None:
+        """Enfileira ``payload``, já em UTF-8, para os clientes locais exceto o emissor.
+
+        O mesmo objeto ``bytes`` é compartilhado pelas filas de todos os
+        destinatários.
 
-    async def _unregister(self, websocket: WebSocketServerProtocol, peer_label: str) -> None:
-        async with self._lock:
-            self._clients.discard(websocket)
-        await self._broadcast(f"[SERVER] {peer_label} saiu do chat.", sender=None)
-        print(f"[SERVER] Cliente desconectado: {peer_label}. Total: {len(self._clients)}")
+        Não há ``await`` entre a leitura de ``_clients`` e o enfileiramento,
+        portanto a lista não muda durante a iteração. Um cliente cuja fila
+        está cheia não acompanha o ritmo do chat e é desconectado. Conexões
+        que já começaram a fechar são ignoradas: o envio só falharia.
+        """
+        slow_clients = []
+        for client in self._clients:
+            websocket = client.websocket
+            if websocket is sender or websocket.state is not State.OPEN:
+                continue
+            try:
+                client.outbox.put_nowait(payload)
+            except asyncio.QueueFull:
+                slow_clients.append(client)
 
-    async def _broadcast(self, message: str, sender: WebSocketServerProtocol | None) -> None:
-        """Envia mensagens a todos os clientes exceto o emissor."""
-        async with self._lock:
-            recipients = [ws for ws in self._clients if ws is not sender]
+        for client in slow_clients:
+            self._drop_client(client)
 
-        if not recipients:
+    def _send_to(self, client: _ChatClient, payload: Optional[bytes]) -> bool:
+        """Enfileira ``payload`` para um único cliente, desconectando-o se a fila estiver cheia."""
+        if client.index < 0:
+            # Já desconectado como cliente lento.
+            return False
+        try:
+            client.outbox.put_nowait(payload)
+        except asyncio.QueueFull:
+            self._drop_client(client)
+            return False
+        return True
+
+    def _drop_client(self, client: _ChatClient) -> None:
+        """Remove um cliente lento do chat e fecha sua conexão em segundo plano."""
+        if client.index < 0:
             return
+        print(f"[SERVER] Cliente {client.label} não acompanha as mensagens; desconectando.")
+        self._remove_client(client)
+        task = asyncio.create_task(client.websocket.close(code=1011, reason="slow consumer"))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _client_writer(self, client: _ChatClient) -> None:
+        """Envia as mensagens da fila do cliente, agrupando as que se acumularam.
 
-        coroutines = []
-        for client in recipients:
-            coroutines.append(client.send(message))
+        As mensagens pendentes seguem em um único quadro de texto separadas por
+        ``\\n``, com uma só escrita no socket em vez de uma por mensagem. No caso
+        comum, com uma única mensagem na fila, ela é enviada diretamente. Todo
+        envio ao cliente passa por aqui, inclusive as respostas do servidor, e
+        a tarefa termina ao encontrar ``None`` na fila.
 
-        await asyncio.gather(*coroutines, return_exceptions=True)
+        Cada envio tem prazo de ``_SEND_TIMEOUT`` segundos, controlado por um
+        temporizador que cancela esta tarefa; ``asyncio.wait_for`` criaria uma
+        tarefa nova por envio.
+        """
+        outbox = client.outbox
+        loop = asyncio.get_running_loop()
+        writer = asyncio.current_task()
+        timed_out = False
 
-    async def _handle_client(self, websocket: WebSocketServerProtocol) -> None:
+        def expire() -> None:
+            nonlocal timed_out
+            timed_out = True
+            writer.cancel()
+
+        try:
+            while True:
+                payload = await outbox.get()
+                if payload is None:
+                    return
+                closing = False
+                if not outbox.empty():
+                    batch = [payload]
+                    while not outbox.empty() and len(batch) < _BATCH_SIZE:
+                        item = outbox.get_nowait()
+                        if item is None:
+                            closing = True
+                            break
+                        batch.append(item)
+                    payload = b"\n".join(batch)
+                # ``text=True`` envia os bytes já codificados em um quadro de
+                # texto, sem decodificá-los nem codificá-los de novo.
+                timer = loop.call_later(_SEND_TIMEOUT, expire)
+                try:
+                    await client.websocket.send(payload, text=True)
+                finally:
+                    timer.cancel()
+                if closing:
+                    return
+        except ConnectionClosed:
+            pass
+        except asyncio.CancelledError:
+            if not timed_out:
+                raise
+            # O cliente parou de ler e o buffer do socket encheu.
+            self._drop_client(client)
+
+    def _classify(self, message: str) -> int:
+        """Indica se a mensagem é retransmitida ou qual resposta recebe."""
+        if not message:
+            return self._EMPTY
+        if len(message) > self.max_message_length:
+            return self._TOO_LONG
+        # A comparação direta cobre o caso comum em minúsculas; o tamanho
+        # descarta quase todas as demais mensagens sem criar a cópia.
+        if message == self._QUIT or (
+            len(message) == len(self._QUIT) and message.lower() == self._QUIT
+        ):
+            return self._LEAVE
+        return self._RELAY
+
+    async def _handle_client(self, websocket: ServerConnection) -> None:
         peer = websocket.remote_address
         peer_label = f"{peer[0]}:{peer[1]}" if peer else "desconhecido"
 
-        await self._register(websocket, peer_label)
+        client = self._register(websocket, peer_label)
+        prefix = client.prefix
 
         try:
             async for raw_message in websocket:
                 message = raw_message.strip()
-                if not message:
-                    await websocket.send("Mensagem vazia ignorada.")
-                    continue
-
-                if len(message) > self.max_message_length:
-                    await websocket.send("Mensagem muito longa, tente novamente.")
+                kind = self._classify(message)
+                if kind != self._RELAY:
+                    self._send_to(client, self._FEEDBACK[kind])
+                    if kind == self._LEAVE:
+                        # A despedida sai antes do fechamento da conexão.
+                        if self._send_to(client, None) and client.writer is not None:
+                            await asyncio.wait({client.writer})
+                        break
                     continue
 
-                if message.lower() == "sair":
-                    await websocket.send("Encerrando sua sessão. Até logo!")
-                    break
-
-                await self._broadcast(f"{peer_label}: {message}", sender=websocket)
+                self._broadcast_bytes(prefix + message.encode("utf-8"), sender=websocket)
+                # Quando há quadros já recebidos, a iteração não suspende; cede a
+                # vez para que as tarefas escritoras esvaziem as filas antes que
+                # uma rajada deste cliente as encha. Se outro worker não está
+                # dando conta do repasse, para de ler deste cliente até ele
+                # esvaziar a fila.
+                relay_ready = self._relay_ready
+                if relay_ready is not None and not relay_ready.is_set():
+                    await relay_ready.wait()
+                else:
+                    await asyncio.sleep(0)
         except (ConnectionClosedOK, ConnectionClosedError):
             print(f"[SERVER] Conexão encerrada abruptamente com {peer_label}.")
         finally:
-            await self._unregister(websocket, peer_label)
+            self._unregister(client)
 
+    def stop(self) -> None:
+        if self._relay is not None:
+            self._relay.close()
+            self._relay = None
+        for peer in self._relay_peers:
+            if peer.sock is not None:
+                peer.sock.close()
+        self._relay_peers = []
 
-if __name__ == "__main__":
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join()
+        self._processes = []
+
+
+def _install_event_loop_policy() -> None:
+    """Usa o laço de eventos do ``uvloop``, se instalado.
+
+    No Windows, onde o ``uvloop`` não existe, escolhe o laço baseado em
+    ``select`` em vez do proactor padrão, que reserva mais memória por conexão.
+    """
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        return
     try:
-        asyncio.run(WebSocketChatServer().run())
-    except KeyboardInterrupt:
-        print("\n[SERVER] Encerrado pelo usuário.")
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+if __name__ == "__main__":
+    _install_event_loop_policy()
+    WebSocketChatServer().start()